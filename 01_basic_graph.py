@@ -5,44 +5,67 @@ LangGraph Tutorial - Part 1: Basic Graph
 This tutorial demonstrates the fundamental concepts of LangGraph:
 1. Defining a State
 2. Creating Nodes
-3. Building a Graph with Edges
+3. Building a Graph with Edges (fanning out to parallel nodes with Send)
 4. Compiling and Running the Graph
 """
 
-from typing_extensions import TypedDict, Annotated
+from dataclasses import dataclass, field
+from typing_extensions import Annotated
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+import functools
+import logging
 import operator
+import sys
+
+# Nodes log through this logger; it only prints once configured in __main__
+log = logging.getLogger(__name__)
 
 
 # Step 1: Define the State
-# The state is a TypedDict that represents the data flowing through the graph
-class State(TypedDict):
+# The state represents the data flowing through the graph. A TypedDict works
+# too; a slotted dataclass gives nodes fast attribute access (state.counter)
+@dataclass(slots=True)
+class State:
     # Annotated with operator.add means values will be accumulated
-    messages: Annotated[list[str], operator.add]
-    counter: int
+    messages: Annotated[list[str], operator.add] = field(default_factory=list)
+    # The counter is accumulated too, so parallel nodes can each add to it
+    # in the same step without an INVALID_CONCURRENT_GRAPH_UPDATE error
+    counter: Annotated[int, operator.add] = 0
 
 
 # Step 2: Define Node Functions
 # Nodes are functions that take state and return state updates
 def node_a(state: State) -> dict:
     """Node A adds a message and increments counter"""
-    print("Executing Node A")
-    return {"messages": ["Hello from Node A!"], "counter": state.get("counter", 0) + 1}
+    log.debug("Executing Node A")
+    return {"messages": ["Hello from Node A!"], "counter": 1}
 
 
 def node_b(state: State) -> dict:
     """Node B adds a message and increments counter"""
-    print("Executing Node B")
-    return {"messages": ["Hello from Node B!"], "counter": state.get("counter", 0) + 1}
+    log.debug("Executing Node B")
+    return {"messages": ["Hello from Node B!"], "counter": 1}
 
 
 def node_c(state: State) -> dict:
     """Node C adds a message and increments counter"""
-    print("Executing Node C")
-    return {"messages": ["Hello from Node C!"], "counter": state.get("counter", 0) + 1}
+    log.debug("Executing Node C")
+    return {"messages": ["Hello from Node C!"], "counter": 1}
+
+
+# Fan-out function: the nodes are independent, so send the state to all of
+# them at once and let LangGraph run them in a single super-step
+def fan_out(state: State) -> list[Send]:
+    """Dispatch the current state to node A, B and C in parallel"""
+    return [Send("node_a", state), Send("node_b", state), Send("node_c", state)]
 
 
 # Step 3: Build the Graph
+# lru_cache makes every call return the same compiled graph, so compile()
+# and its validation run once per process. The other tutorials' build
+# functions are cached the same way.
+@functools.lru_cache(maxsize=None)
 def build_graph():
     """Create and configure the StateGraph"""
     # Initialize the graph with our State schema
@@ -53,10 +76,13 @@ def build_graph():
     graph_builder.add_node("node_b", node_b)
     graph_builder.add_node("node_c", node_c)
 
-    # Define the flow: START -> A -> B -> C -> END
-    graph_builder.add_edge(START, "node_a")
-    graph_builder.add_edge("node_a", "node_b")
-    graph_builder.add_edge("node_b", "node_c")
+    # Define the flow: START -> (A | B | C in parallel) -> END
+    # The list of node names is only used to draw the graph
+    graph_builder.add_conditional_edges(
+        START, fan_out, ["node_a", "node_b", "node_c"]
+    )
+    graph_builder.add_edge("node_a", END)
+    graph_builder.add_edge("node_b", END)
     graph_builder.add_edge("node_c", END)
 
     # Compile the graph to make it executable
@@ -66,6 +92,10 @@ def build_graph():
 
 # Step 4: Run the Graph
 if __name__ == "__main__":
+    # Show node debug logs when run as a script
+    logging.basicConfig(stream=sys.stdout, format="%(message)s")
+    log.setLevel(logging.DEBUG)
+
     # Build the graph
     graph = build_graph()
 
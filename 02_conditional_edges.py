@@ -7,53 +7,60 @@ This tutorial demonstrates conditional routing in LangGraph:
 2. Dynamic decision making in the graph
 """
 
-from typing_extensions import TypedDict, Annotated
+from dataclasses import dataclass, field
+from typing_extensions import Annotated
 from langgraph.graph import StateGraph, START, END
+import functools
+import logging
 import operator
+import sys
+
+log = logging.getLogger(__name__)
 
 
 # Define State with a routing field
-class State(TypedDict):
-    messages: Annotated[list[str], operator.add]
-    route: str  # Determines which path to take
-    value: int
+# (a slotted dataclass, so nodes use attribute access: state.value)
+@dataclass(slots=True)
+class State:
+    messages: Annotated[list[str], operator.add] = field(default_factory=list)
+    route: str = "path_b"  # Determines which path to take
+    value: int = 0
 
 
 # Node functions
 def start_node(state: State) -> dict:
     """Start node that sets up routing"""
-    print("Executing Start Node")
+    log.debug("Executing Start Node")
     return {
         "messages": ["Starting..."],
-        "route": state.get(
-            "route", "path_b"
-        ),  # Change this to "path_b" or "path_c" to see different paths
+        # Change this to "path_b" or "path_c" to see different paths
+        "route": state.route,
         "value": 10,
     }
 
 
 def path_b_node(state: State) -> dict:
     """Path B: multiplies value by 2"""
-    print("Executing Path B (multiply by 2)")
+    log.debug("Executing Path B (multiply by 2)")
     return {
-        "messages": [f"Path B: {state['value']} * 2 = {state['value'] * 2}"],
-        "value": state["value"] * 2,
+        "messages": [f"Path B: {state.value} * 2 = {state.value * 2}"],
+        "value": state.value * 2,
     }
 
 
 def path_c_node(state: State) -> dict:
     """Path C: adds 5 to value"""
-    print("Executing Path C (add 5)")
+    log.debug("Executing Path C (add 5)")
     return {
-        "messages": [f"Path C: {state['value']} + 5 = {state['value'] + 5}"],
-        "value": state["value"] + 5,
+        "messages": [f"Path C: {state.value} + 5 = {state.value + 5}"],
+        "value": state.value + 5,
     }
 
 
 def final_node(state: State) -> dict:
     """Final node that processes the result"""
-    print("Executing Final Node")
-    return {"messages": [f"Final value: {state['value']}"]}
+    log.debug("Executing Final Node")
+    return {"messages": [f"Final value: {state.value}"]}
 
 
 # Conditional routing function
@@ -62,12 +69,13 @@ def route_decision(state: State) -> str:
     This function determines which node to go to next.
     It must return a string matching one of the node names.
     """
-    route = state.get("route")
-    print(f"State: {state}")
-    print(f"Routing decision: {route}")
+    route = state.route
+    log.debug("State: %s", state)
+    log.debug("Routing decision: %s", route)
     return route
 
 
+@functools.lru_cache(maxsize=None)
 def build_graph():
     """Create graph with conditional edges"""
     graph_builder = StateGraph(State)
@@ -100,6 +108,9 @@ def build_graph():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stdout, format="%(message)s")
+    log.setLevel(logging.DEBUG)
+
     graph = build_graph()
 
     # Test with route to path_b
@@ -8,13 +8,34 @@ Note: Uses Ollama's Llama 3.1 for LLM functionality (runs locally).
 
 from typing_extensions import TypedDict, Annotated
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-import operator
+import asyncio
+import functools
+import logging
+import sys
+import uuid
+
+log = logging.getLogger(__name__)
 
 
 # State for chatbot - uses messages list
 class ChatState(TypedDict):
-    messages: Annotated[list[BaseMessage], operator.add]
+    # add_messages appends new messages (and updates ones with a matching id)
+    messages: Annotated[list[BaseMessage], add_messages]
+
+
+def _handle_human(message: HumanMessage) -> dict:
+    """Reply to a user message"""
+    # Simple echo response (replace with LLM call in production)
+    response = f"Echo: {message.content}"
+    log.debug("Chatbot processing: %s", message.content)
+    return {"messages": [AIMessage(content=response)]}
+
+
+# Message type -> handler; other message types are ignored
+_HANDLERS = {HumanMessage: _handle_human}
 
 
 def chatbot_node(state: ChatState) -> dict:
@@ -25,14 +46,11 @@ def chatbot_node(state: ChatState) -> dict:
     messages = state["messages"]
     last_message = messages[-1]
 
-    if isinstance(last_message, HumanMessage):
-        # Simple echo response (replace with LLM call in production)
-        response = f"Echo: {last_message.content}"
-        print(f"Chatbot processing: {last_message.content}")
-        return {"messages": [AIMessage(content=response)]}
-    return {}
+    handler = _HANDLERS.get(type(last_message))
+    return handler(last_message) if handler else {}
 
 
+@functools.lru_cache(maxsize=None)
 def build_chatbot_graph():
     """Build a simple chatbot graph"""
     graph_builder = StateGraph(ChatState)
@@ -48,6 +66,34 @@ def build_chatbot_graph():
 
 
 # Advanced version with actual LLM (uses Ollama)
+@functools.lru_cache(maxsize=1)
+def _get_llm():
+    """
+    Create the Ollama client once per process.
+    Every graph build and invocation shares it (and its HTTP connection pool).
+    """
+    from langchain_ollama import ChatOllama
+
+    # Initialize Ollama LLM with Llama 3.1
+    return ChatOllama(
+        model="llama3.1",
+        temperature=0,
+        base_url="http://localhost:11434",  # Default Ollama URL
+        client_kwargs={"timeout": 30},
+    )
+
+
+async def llm_chatbot_node(state: ChatState) -> dict:
+    """Chatbot node that uses an actual LLM (async, so LLM calls can overlap)"""
+    messages = state["messages"]
+    log.debug("LLM processing %d messages", len(messages))
+
+    # Call the LLM with all messages without blocking the event loop
+    response = await _get_llm().ainvoke(messages)
+    return {"messages": [response]}
+
+
+@functools.lru_cache(maxsize=None)
 def build_llm_chatbot_graph():
     """
     Build a chatbot graph with Ollama's Llama 3.1.
@@ -55,23 +101,8 @@ def build_llm_chatbot_graph():
     Install model: ollama pull llama3.1
     """
     try:
-        from langchain_ollama import ChatOllama
-
-        # Initialize Ollama LLM with Llama 3.1
-        llm = ChatOllama(
-            model="llama3.1",
-            temperature=0,
-            base_url="http://localhost:11434",  # Default Ollama URL
-        )
-
-        def llm_chatbot_node(state: ChatState) -> dict:
-            """Chatbot node that uses an actual LLM"""
-            messages = state["messages"]
-            print(f"LLM processing {len(messages)} messages")
-
-            # Call the LLM with all messages
-            response = llm.invoke(messages)
-            return {"messages": [response]}
+        # Fail early (and fall back) if the LLM can't be created
+        _get_llm()
 
         graph_builder = StateGraph(ChatState)
         graph_builder.add_node("chatbot", llm_chatbot_node)
@@ -85,17 +116,45 @@ def build_llm_chatbot_graph():
         return build_chatbot_graph()
 
 
-if __name__ == "__main__":
-    # Check if Ollama is available (simple check)
-    try:
-        import httpx
-
-        response = httpx.get("http://localhost:11434/api/tags", timeout=1.0)
-        has_ollama = response.status_code == 200
-    except Exception:
-        has_ollama = False
-
-    if has_ollama:
+async def run_conversation_batch(graph, messages_list, max_concurrency=16):
+    """
+    Run many independent conversations at once with graph.abatch.
+    Each string in messages_list starts its own conversation (with its own
+    thread_id), and LLM round-trips for the different conversations overlap.
+    """
+    states = [{"messages": [HumanMessage(content=m)]} for m in messages_list]
+    configs = [
+        {
+            "configurable": {"thread_id": str(uuid.uuid4())},
+            "max_concurrency": max_concurrency,
+        }
+        for _ in messages_list
+    ]
+    return await graph.abatch(states, configs)
+
+
+# Result of the Ollama availability probe, cached for the process lifetime
+_ollama_available = None
+
+
+async def has_ollama() -> bool:
+    """Check (once per process) whether a local Ollama server is running"""
+    global _ollama_available
+    if _ollama_available is None:
+        try:
+            import httpx
+
+            # Short timeouts: a local server answers almost instantly
+            async with httpx.AsyncClient(timeout=httpx.Timeout(0.2)) as client:
+                response = await client.get("http://localhost:11434/api/tags")
+            _ollama_available = response.status_code == 200
+        except Exception:
+            _ollama_available = False
+    return _ollama_available
+
+
+async def main():
+    if await has_ollama():
         print("=" * 50)
         print("Building Ollama Llama 3.1 Chatbot")
         print("=" * 50)
@@ -108,20 +167,43 @@ if __name__ == "__main__":
         print("=" * 50)
         graph = build_chatbot_graph()
 
+    # Recompile with a checkpointer so the conversation history is kept
+    # per thread_id and each turn only needs to send the new message
+    graph = graph.builder.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "conversation-1"}}
+
     # Simulate a conversation
     print("\nStarting conversation...\n")
 
     # First message
     state = {"messages": [HumanMessage(content="Hello! What is LangGraph?")]}
-    result = graph.invoke(state)
+    result = await graph.ainvoke(state, config)
     print(f"User: {state['messages'][0].content}")
     print(f"Assistant: {result['messages'][-1].content}\n")
 
     # Second message (continuing the conversation)
-    state = {
-        "messages": result["messages"]
-        + [HumanMessage(content="Can you give me an example?")]
-    }
-    result = graph.invoke(state)
+    # Only the new message is sent - the reducer appends it to the saved history
+    state = {"messages": [HumanMessage(content="Can you give me an example?")]}
+    result = await graph.ainvoke(state, config)
     print(f"User: {state['messages'][-1].content}")
     print(f"Assistant: {result['messages'][-1].content}\n")
+
+    # Several independent conversations, run as one batch
+    print("Running a batch of conversations...\n")
+    questions = [
+        "What is a node?",
+        "What is an edge?",
+        "What is a reducer?",
+    ]
+    results = await run_conversation_batch(graph, questions)
+    for question, result in zip(questions, results):
+        print(f"User: {question}")
+        print(f"Assistant: {result['messages'][-1].content}\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stdout, format="%(message)s")
+    log.setLevel(logging.DEBUG)
+
+    # The graph is invoked asynchronously so LLM round-trips don't block
+    asyncio.run(main())
@@ -10,92 +10,175 @@ This tutorial demonstrates:
 
 from typing_extensions import TypedDict, Annotated
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
+from langgraph.graph.message import add_messages
+from langgraph.types import RetryPolicy
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage
-from langchain_core.tools import tool
-import operator
+import ast
+import asyncio
+import functools
+import math
+import re
+import threading
+
+
+# Only plain arithmetic is allowed in calculator expressions
+_SAFE_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Pow,
+    ast.Mod,
+    ast.UAdd,
+    ast.USub,
+)
+
+
+# Largest result (in bits) a power may produce, so inputs like 9**9**9
+# fail fast instead of tying up the CPU
+_MAX_POW_BITS = 4096
+
+
+def _safe_pow(base, exponent):
+    """base ** exponent, refusing integer powers whose result would be huge"""
+    if isinstance(exponent, int) and exponent > 1 and abs(base) > 1:
+        if exponent * math.log2(abs(base)) > _MAX_POW_BITS:
+            raise ValueError("result too large")
+    return base**exponent
+
+
+class _GuardPow(ast.NodeTransformer):
+    """Rewrite every a ** b into _pow(a, b) so the size check always runs"""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return ast.Call(
+                func=ast.Name(id="_pow", ctx=ast.Load()),
+                args=[node.left, node.right],
+                keywords=[],
+            )
+        return node
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(expression: str):
+    """Parse and compile an arithmetic expression, rejecting anything else"""
+    tree = ast.parse(expression, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _SAFE_NODES):
+            raise ValueError(f"unsupported expression: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            raise ValueError(f"unsupported constant: {node.value!r}")
+    tree = ast.fix_missing_locations(_GuardPow().visit(tree))
+    return compile(tree, "<calculator>", "eval")
 
 
 # Define tools
-@tool
-def calculator(expression: str) -> str:
-    """Evaluate a mathematical expression. Input should be a valid Python expression."""
-    try:
-        result = eval(expression)
-        return f"Result: {result}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+# Tools are created on first use so importing this module doesn't pull in
+# langchain_core.tools until the agent graph is actually built
+@functools.lru_cache(maxsize=1)
+def get_tools():
+    """Create the list of tools available to the agent"""
+    from langchain_core.tools import tool
+
+    @tool
+    def calculator(expression: str) -> str:
+        """Evaluate a mathematical expression. Input should be an arithmetic expression."""
+        try:
+            result = eval(
+                _compile(expression), {"__builtins__": {}, "_pow": _safe_pow}, {}
+            )
+            return f"Result: {result}"
+        except Exception as e:
+            return f"Error: {str(e)}"
 
+    @tool
+    def get_weather(city: str) -> str:
+        """Get the weather for a city. Returns mock weather data."""
+        # In production, this would call a real weather API
+        return f"The weather in {city} is sunny, 72°F"
 
-@tool
-def get_weather(city: str) -> str:
-    """Get the weather for a city. Returns mock weather data."""
-    # In production, this would call a real weather API
-    return f"The weather in {city} is sunny, 72°F"
+    return [calculator, get_weather]
 
 
-# Create list of tools
-tools = [calculator, get_weather]
+# Keywords that trigger a tool, matched in a single case-insensitive pass
+_INTENT_RE = re.compile(r"(calculate|math|weather|[+*])", re.IGNORECASE)
+# Keywords removed from a message to leave just the math expression
+_STRIP_RE = re.compile(r"calculate|math", re.IGNORECASE)
 
 
 # State for the agent
 class AgentState(TypedDict):
-    messages: Annotated[list[BaseMessage], operator.add]
+    # add_messages appends new messages (and updates ones with a matching id)
+    messages: Annotated[list[BaseMessage], add_messages]
+
+
+def _handle_human(message: HumanMessage) -> dict:
+    """Decide whether a user message needs a tool call"""
+    content = message.content
+
+    # Simple rule-based routing (in production, LLM decides)
+    match = _INTENT_RE.search(content)
+    intent = match.group(1).lower() if match else None
+
+    if intent in ("calculate", "math", "+", "*"):
+        # Extract expression (simplified - in production, LLM would do this)
+        expression = _STRIP_RE.sub("", content).strip()
+        # Create tool call
+        tool_message = AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": "calculator",
+                    "args": {"expression": expression},
+                    "id": "1",
+                }
+            ],
+        )
+        return {"messages": [tool_message]}
+
+    elif intent == "weather":
+        # Extract city (simplified)
+        city = "San Francisco"  # Default
+        if "in" in content:
+            parts = content.split("in")
+            if len(parts) > 1:
+                city = parts[-1].strip()
+
+        tool_message = AIMessage(
+            content="",
+            tool_calls=[{"name": "get_weather", "args": {"city": city}, "id": "2"}],
+        )
+        return {"messages": [tool_message]}
+
+    else:
+        # Regular response
+        response = f"I can help with calculations and weather. You said: {message.content}"
+        return {"messages": [AIMessage(content=response)]}
+
+
+# Message type -> handler; tool results and AI messages need no further action
+_HANDLERS = {HumanMessage: _handle_human}
 
 
 def chatbot_node(state: AgentState) -> dict:
     """
     Simple chatbot that decides whether to use tools.
-    In production, this would use an LLM with tool binding.
+    In production, this would use an LLM with tool binding
     """
+    # With a real model, make this node async and await llm.ainvoke(...)
+    # here so model calls don't block the event loop
     messages = state["messages"]
     last_message = messages[-1]
 
-    if isinstance(last_message, HumanMessage):
-        content = last_message.content.lower()
-
-        # Simple rule-based routing (in production, LLM decides)
-        if (
-            "calculate" in content
-            or "math" in content
-            or "+" in content
-            or "*" in content
-        ):
-            # Extract expression (simplified - in production, LLM would do this)
-            expression = content.replace("calculate", "").replace("math", "").strip()
-            # Create tool call
-            tool_message = AIMessage(
-                content="",
-                tool_calls=[
-                    {
-                        "name": "calculator",
-                        "args": {"expression": expression},
-                        "id": "1",
-                    }
-                ],
-            )
-            return {"messages": [tool_message]}
-
-        elif "weather" in content:
-            # Extract city (simplified)
-            city = "San Francisco"  # Default
-            if "in" in content:
-                parts = content.split("in")
-                if len(parts) > 1:
-                    city = parts[-1].strip()
-
-            tool_message = AIMessage(
-                content="",
-                tool_calls=[{"name": "get_weather", "args": {"city": city}, "id": "2"}],
-            )
-            return {"messages": [tool_message]}
-
-        else:
-            # Regular response
-            response = f"I can help with calculations and weather. You said: {last_message.content}"
-            return {"messages": [AIMessage(content=response)]}
-
-    return {}
+    handler = _HANDLERS.get(type(last_message))
+    return handler(last_message) if handler else {}
 
 
 def should_continue(state: AgentState) -> str:
@@ -111,13 +194,18 @@ def should_continue(state: AgentState) -> str:
     return END
 
 
-def build_agent_graph():
-    """Build an agent graph with tools"""
+def _compile_agent_graph():
+    """Build and compile a new agent graph with tools"""
+    from langgraph.prebuilt import ToolNode
+
     graph_builder = StateGraph(AgentState)
 
     # Add nodes
-    graph_builder.add_node("chatbot", chatbot_node)
-    graph_builder.add_node("tools", ToolNode(tools))
+    # The chatbot retries transient errors
+    graph_builder.add_node(
+        "chatbot", chatbot_node, retry_policy=RetryPolicy(max_attempts=3)
+    )
+    graph_builder.add_node("tools", ToolNode(get_tools()))
 
     # Define flow
     graph_builder.add_edge(START, "chatbot")
@@ -133,7 +221,38 @@ def build_agent_graph():
     return graph_builder.compile()
 
 
-if __name__ == "__main__":
+@functools.lru_cache(maxsize=None)
+def build_agent_graph():
+    """Build an agent graph with tools"""
+    return _compile_agent_graph()
+
+
+# Per-thread graphs for multi-threaded servers
+_TLS = threading.local()
+
+
+def get_graph():
+    """
+    Return this thread's compiled agent graph, building it on first use.
+    Each worker thread gets its own graph, so threads never contend on
+    shared graph state.
+    """
+    if not hasattr(_TLS, "graph"):
+        _TLS.graph = _compile_agent_graph()
+    return _TLS.graph
+
+
+def print_turn_results(state: AgentState, result: dict) -> None:
+    """Print tool results and replies produced by this turn"""
+    # Only look at messages added after the input, not the earlier history
+    for msg in result["messages"][len(state["messages"]) :]:
+        if isinstance(msg, ToolMessage):
+            print(f"Tool Result: {msg.content}")
+        elif isinstance(msg, AIMessage) and msg.content:
+            print(f"Assistant: {msg.content}")
+
+
+async def main():
     graph = build_agent_graph()
 
     print("=" * 50)
@@ -143,29 +262,31 @@ if __name__ == "__main__":
     # Test 1: Regular message
     print("\n--- Test 1: Regular Message ---")
     state = {"messages": [HumanMessage(content="Hello!")]}
-    result = graph.invoke(state)
+    result = await graph.ainvoke(state)
     print(f"User: {state['messages'][0].content}")
     print(f"Assistant: {result['messages'][-1].content}")
 
     # Test 2: Math calculation
     print("\n--- Test 2: Math Calculation ---")
     state = {"messages": [HumanMessage(content="Calculate 15 * 7 + 3")]}
-    result = graph.invoke(state)
+    result = await graph.ainvoke(state)
     print(f"User: {state['messages'][0].content}")
     # Find the tool result
-    for msg in result["messages"]:
-        if isinstance(msg, ToolMessage):
-            print(f"Tool Result: {msg.content}")
-        elif isinstance(msg, AIMessage) and msg.content:
-            print(f"Assistant: {msg.content}")
+    print_turn_results(state, result)
 
     # Test 3: Weather query
     print("\n--- Test 3: Weather Query ---")
     state = {"messages": [HumanMessage(content="What's the weather in New York?")]}
-    result = graph.invoke(state)
+    result = await graph.ainvoke(state)
     print(f"User: {state['messages'][0].content}")
-    for msg in result["messages"]:
-        if isinstance(msg, ToolMessage):
-            print(f"Tool Result: {msg.content}")
-        elif isinstance(msg, AIMessage) and msg.content:
-            print(f"Assistant: {msg.content}")
+    print_turn_results(state, result)
+
+
+if __name__ == "__main__":
+    # Use uvloop's faster event loop when it's installed (uv pip install uvloop)
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+
+    (uvloop.run if uvloop else asyncio.run)(main())
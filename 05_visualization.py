@@ -9,35 +9,39 @@ This tutorial demonstrates different ways to visualize LangGraph workflows:
 4. Exporting for documentation
 """
 
-from typing_extensions import TypedDict, Annotated
+from dataclasses import dataclass, field
+from typing_extensions import Annotated
 from langgraph.graph import StateGraph, START, END
+import functools
 import operator
 
 
 # Define a sample state for demonstration
-class State(TypedDict):
-    messages: Annotated[list[str], operator.add]
-    counter: int
-    route: str
+@dataclass(slots=True)
+class State:
+    messages: Annotated[list[str], operator.add] = field(default_factory=list)
+    counter: Annotated[int, operator.add] = 0  # Each node adds 1
+    route: str = "node_b"
 
 
 # Sample nodes
 def node_a(state: State) -> dict:
-    return {"messages": ["A"], "counter": state.get("counter", 0) + 1}
+    return {"messages": ["A"], "counter": 1}
 
 
 def node_b(state: State) -> dict:
-    return {"messages": ["B"], "counter": state.get("counter", 0) + 1}
+    return {"messages": ["B"], "counter": 1}
 
 
 def node_c(state: State) -> dict:
-    return {"messages": ["C"], "counter": state.get("counter", 0) + 1}
+    return {"messages": ["C"], "counter": 1}
 
 
 def route_decision(state: State) -> str:
-    return state.get("route", "node_b")
+    return state.route
 
 
+@functools.lru_cache(maxsize=None)
 def build_example_graph():
     """Build a graph with conditional edges for visualization"""
     graph_builder = StateGraph(State)
@@ -56,13 +60,12 @@ def build_example_graph():
     return graph_builder.compile()
 
 
-def visualize_mermaid_text(graph):
+def visualize_mermaid_text(graph_structure):
     """Method 1: Get Mermaid diagram as text"""
     print("=" * 60)
     print("Method 1: Mermaid Diagram (Text Format)")
     print("=" * 60)
     try:
-        graph_structure = graph.get_graph()
         mermaid_diagram = graph_structure.draw_mermaid()
         print(mermaid_diagram)
         print("\n💡 Tip: You can copy this into Markdown files or Mermaid editors")
@@ -73,13 +76,12 @@ def visualize_mermaid_text(graph):
         return None
 
 
-def visualize_png_image(graph, filename="graph.png"):
+def visualize_png_image(graph_structure, filename="graph.png"):
     """Method 2: Save as PNG image (requires system graphviz)"""
     print("\n" + "=" * 60)
     print("Method 2: PNG Image Export")
     print("=" * 60)
     try:
-        graph_structure = graph.get_graph()
         graph_image = graph_structure.draw_mermaid_png()
 
         with open(filename, "wb") as f:
@@ -120,13 +122,12 @@ def visualize_png_image(graph, filename="graph.png"):
         return False
 
 
-def visualize_ascii(graph):
+def visualize_ascii(graph_structure):
     """Method 3: ASCII art representation"""
     print("\n" + "=" * 60)
     print("Method 3: ASCII Art Visualization")
     print("=" * 60)
     try:
-        graph_structure = graph.get_graph()
         ascii_art = graph_structure.draw_ascii()
         print(ascii_art)
         return ascii_art
@@ -135,15 +136,15 @@ def visualize_ascii(graph):
         return None
 
 
-def save_mermaid_to_file(graph, filename="graph.mmd"):
-    """Save Mermaid diagram to a file for documentation"""
+def save_mermaid_to_file(mermaid_diagram, filename="graph.mmd"):
+    """Save an already rendered Mermaid diagram to a file for documentation"""
     print("\n" + "=" * 60)
     print("Method 4: Save Mermaid to File")
     print("=" * 60)
+    if mermaid_diagram is None:
+        print("⚠ No Mermaid diagram to save (see Method 1 error)")
+        return False
     try:
-        graph_structure = graph.get_graph()
-        mermaid_diagram = graph_structure.draw_mermaid()
-
         with open(filename, "w") as f:
             f.write(mermaid_diagram)
 
@@ -158,14 +159,12 @@ def save_mermaid_to_file(graph, filename="graph.mmd"):
         return False
 
 
-def print_graph_info(graph):
+def print_graph_info(graph_structure):
     """Print information about the graph structure"""
     print("\n" + "=" * 60)
     print("Graph Information")
     print("=" * 60)
     try:
-        graph_structure = graph.get_graph()
-
         # Get nodes
         nodes = graph_structure.nodes
         print(f"\nNodes ({len(nodes)}):")
@@ -188,25 +187,28 @@ if __name__ == "__main__":
     # Build the example graph
     graph = build_example_graph()
 
+    # Introspect the graph once and share the structure between all methods
+    graph_structure = graph.get_graph()
+
     print("LangGraph Visualization Tutorial")
     print("=" * 60)
     print("\nThis script demonstrates multiple ways to visualize your LangGraph.")
     print("Choose the method that works best for your needs.\n")
 
     # Method 1: Mermaid text (always works)
-    mermaid_text = visualize_mermaid_text(graph)
+    mermaid_text = visualize_mermaid_text(graph_structure)
 
     # Method 2: PNG image (requires system graphviz)
-    visualize_png_image(graph, "example_graph.png")
+    visualize_png_image(graph_structure, "example_graph.png")
 
     # Method 3: ASCII art
-    visualize_ascii(graph)
+    visualize_ascii(graph_structure)
 
-    # Method 4: Save Mermaid to file
-    save_mermaid_to_file(graph, "example_graph.mmd")
+    # Method 4: Save Mermaid to file (reuses the text rendered in Method 1)
+    save_mermaid_to_file(mermaid_text, "example_graph.mmd")
 
     # Print graph structure info
-    print_graph_info(graph)
+    print_graph_info(graph_structure)
 
     print("\n" + "=" * 60)
     print("Summary")
@@ -13,64 +13,220 @@ LangSmith provides:
 - Conversation analytics
 """
 
+from typing import Callable
 from typing_extensions import TypedDict, Annotated
 from langgraph.graph import StateGraph, START, END
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from langchain_core.tracers.context import tracing_v2_enabled
-from langsmith import Client
-import operator
+import contextlib
+import functools
+import hashlib
+import logging
 import os
-from dotenv import load_dotenv
+import random
+import sys
+import types
 
-# Load environment variables
-load_dotenv()
+# dotenv and langchain_ollama are imported lazily; load_dotenv only runs
+# under __main__
+
+log = logging.getLogger(__name__)
+
+
+def _append_messages(left: list[BaseMessage], right: list[BaseMessage]):
+    """
+    Reducer that appends new messages. It builds a new list rather than
+    extending in place, so state snapshots yielded while streaming never
+    share (and later see changes to) the same list.
+    """
+    if not right:
+        # Nothing to add - keep the existing list without copying it
+        return left
+    return left + right
 
 
 # State for the chatbot
 class ChatState(TypedDict):
-    messages: Annotated[list[BaseMessage], operator.add]
+    messages: Annotated[list[BaseMessage], _append_messages]
     turn_count: int
 
 
+# Trace fields longer than this (in characters) are replaced by a summary
+_MAX_TRACE_FIELD_CHARS = 4096
+
+
+def mask_large_fields(data: dict) -> dict:
+    """
+    Replace large trace input/output fields with their length and a short hash.
+    Keeps trace payloads small while still showing the shape of the data.
+    """
+    masked = {}
+    for key, value in data.items():
+        text = str(value)
+        if len(text) > _MAX_TRACE_FIELD_CHARS:
+            value = {
+                "_len": len(text),
+                "_sha": hashlib.blake2b(text.encode(), digest_size=8).hexdigest(),
+            }
+        masked[key] = value
+    return masked
+
+
+def _set_env(name: str, value: str) -> None:
+    """Set an environment variable only if it doesn't already have this value"""
+    if os.environ.get(name) != value:
+        os.environ[name] = value
+
+
+@functools.lru_cache(maxsize=1)
 def setup_langsmith():
     """
-    Configure LangSmith tracing.
+    Configure LangSmith tracing (once per process - later calls return the
+    same client and its connection pool).
 
     Required environment variables:
     - LANGSMITH_API_KEY: Your LangSmith API key
     - LANGCHAIN_PROJECT: Project name (optional, defaults to 'default')
+    - LANGSMITH_SAMPLE_RATE: Fraction of runs to trace (optional, defaults to 1.0)
     """
-    # Check if LangSmith is configured
+    # Read the settings once (setup runs once per process)
     api_key = os.getenv("LANGSMITH_API_KEY")
+    endpoint = os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
+    project = os.getenv("LANGSMITH_PROJECT", "langraph-tutorial")
 
+    # Check if LangSmith is configured
     if not api_key:
+        # Without a key nothing can be exported, so make sure tracing is off
+        # (a stray LANGSMITH_TRACING=true would still register a tracer)
+        os.environ.pop("LANGSMITH_TRACING", None)
+        os.environ.pop("LANGCHAIN_TRACING_V2", None)
         print("⚠️  LangSmith API key not found!")
         print("   Set LANGSMITH_API_KEY or LANGCHAIN_API_KEY in your .env file")
         print("   Get your API key from: https://smith.langchain.com/")
         return None
 
     # Enable tracing
-    os.environ["LANGSMITH_TRACING"] = "true"
-    os.environ["LANGSMITH_ENDPOINT"] = os.getenv(
-        "LANGSMITH_ENDPOINT", "https://api.smith.langchain.com"
-    )
-    os.environ["LANGCHAIN_PROJECT"] = os.getenv(
-        "LANGSMITH_PROJECT", "langraph-tutorial"
-    )
+    _set_env("LANGSMITH_TRACING", "true")
+    # Submit runs from a background thread so traces never block graph.invoke
+    # (set LANGCHAIN_CALLBACKS_BACKGROUND=false only for short-lived scripts)
+    os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
+    _set_env("LANGSMITH_ENDPOINT", endpoint)
+    _set_env("LANGCHAIN_PROJECT", project)
+
+    from langsmith import Client
 
     # Create LangSmith client
+    # auto_batch_tracing groups runs into batched POSTs to /runs/batch
     client = Client(
         api_key=api_key,
-        api_url=os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com"),
+        api_url=endpoint,
+        auto_batch_tracing=True,
+        # Fail fast on connect (5s) but give batch uploads time to finish (30s);
+        # the client keeps one pooled keep-alive session for all requests
+        timeout_ms=(5_000, 30_000),
+        # Large inputs/outputs (e.g. long message histories) are summarised
+        hide_inputs=mask_large_fields,
+        hide_outputs=mask_large_fields,
     )
 
     print("✅ LangSmith tracing enabled")
-    print(f"   Project: {os.environ['LANGCHAIN_PROJECT']}")
+    print(f"   Project: {project}")
+    print(f"   Sample rate: {get_sample_rate()}")
     print("   View traces at: https://smith.langchain.com/")
 
     return client
 
 
+@functools.lru_cache(maxsize=1)
+def get_sample_rate() -> float:
+    """Read LANGSMITH_SAMPLE_RATE (0.0 - 1.0), the fraction of runs to trace"""
+    rate = float(os.getenv("LANGSMITH_SAMPLE_RATE", "1.0"))
+    if not 0.0 <= rate <= 1.0:
+        raise ValueError(
+            f"LANGSMITH_SAMPLE_RATE must be between 0.0 and 1.0, got {rate}"
+        )
+    return rate
+
+
+def is_sampled() -> bool:
+    """Roll the dice for one top-level run"""
+    return random.random() < get_sample_rate()
+
+
+@contextlib.contextmanager
+def maybe_tracing(sampled: bool | None = None):
+    """
+    Trace a top-level run only if it is sampled (head-based sampling).
+    The decision is made once per run, so all of its child runs agree;
+    pass `sampled` to reuse a decision made with is_sampled().
+    Sampled runs carry the sample rate as metadata so dashboards can
+    extrapolate totals. The tracer itself is registered once, in __main__.
+    """
+    from langsmith.run_helpers import tracing_context
+
+    rate = get_sample_rate()
+    if sampled is None:
+        sampled = is_sampled()
+    if not sampled:
+        # Not sampled: switch tracing off for the whole run
+        with tracing_context(enabled=False):
+            yield
+        return
+
+    with tracing_context(metadata={"sample_rate": rate}):
+        yield
+
+
+def batch_with_sampling(graph, states: list, configs: list) -> list:
+    """
+    Run graph.batch with a separate sampling decision for each run.
+    Runs are grouped by decision, so this makes at most two batch calls;
+    results come back in input order.
+    """
+    decisions = [is_sampled() for _ in states]
+    results = [None] * len(states)
+    for sampled in (True, False):
+        indices = [i for i, d in enumerate(decisions) if d is sampled]
+        if not indices:
+            continue
+        with maybe_tracing(sampled):
+            outputs = graph.batch(
+                [states[i] for i in indices], [configs[i] for i in indices]
+            )
+        for i, output in zip(indices, outputs):
+            results[i] = output
+    return results
+
+
+# Banner separator, built once and written with the title in a single call
+_SEP = "=" * 60 + "\n"
+
+
+def print_banner(title: str) -> None:
+    """Write a section banner (separator, title, separator) in one write"""
+    sys.stdout.write("\n" + _SEP + title + "\n" + _SEP)
+
+
+# Prefix for the simulated LLM reply
+_ECHO_PREFIX = "Echo: "
+
+
+def _handle_human(message: HumanMessage, state: ChatState) -> dict:
+    """Reply to a user message and count the turn"""
+    # Simulate LLM processing
+    response = _ECHO_PREFIX + message.content
+    log.debug("Chatbot processing: %s", message.content)
+    return {
+        "messages": [AIMessage(content=response)],
+        "turn_count": state.get("turn_count", 0) + 1,
+    }
+
+
+# Message type -> handler; other message types are ignored
+_HANDLERS: dict[type, Callable[[BaseMessage, ChatState], dict]] = {
+    HumanMessage: _handle_human,
+}
+
+
 def chatbot_node(state: ChatState) -> dict:
     """
     Simple chatbot node that processes messages.
@@ -79,17 +235,11 @@ def chatbot_node(state: ChatState) -> dict:
     messages = state["messages"]
     last_message = messages[-1]
 
-    if isinstance(last_message, HumanMessage):
-        # Simulate LLM processing
-        response = f"Echo: {last_message.content}"
-        print(f"Chatbot processing: {last_message.content}")
-        return {
-            "messages": [AIMessage(content=response)],
-            "turn_count": state.get("turn_count", 0) + 1,
-        }
-    return {}
+    handler = _HANDLERS.get(type(last_message))
+    return handler(last_message, state) if handler else {}
 
 
+@functools.lru_cache(maxsize=None)
 def build_chatbot_graph():
     """Build a simple chatbot graph"""
     graph_builder = StateGraph(ChatState)
@@ -101,6 +251,44 @@ def build_chatbot_graph():
     return graph_builder.compile()
 
 
+@functools.lru_cache(maxsize=1)
+def _get_ollama_llm():
+    """
+    Create the Ollama client once per process, so every graph build and
+    LLM call reuses the same HTTP connection pool.
+    """
+    # Ollama support is optional - ImportError falls back to the echo chatbot
+    import httpx
+    from langchain_ollama import ChatOllama
+
+    # Initialize Ollama LLM with Llama 3.1
+    return ChatOllama(
+        model="llama3.1",
+        temperature=0,
+        base_url="http://localhost:11434",  # Default Ollama URL
+        # Passed through to the underlying httpx client
+        client_kwargs={"limits": httpx.Limits(max_keepalive_connections=10)},
+    )
+
+
+def llm_chatbot_node(state: ChatState) -> dict:
+    """Chatbot node that uses an actual LLM (traced by LangSmith)"""
+    messages = state["messages"]
+    log.debug("LLM processing %d messages", len(messages))
+
+    # This LLM call will be automatically traced (long message
+    # bodies are masked by the client, the count is kept as metadata)
+    response = _get_ollama_llm().invoke(
+        messages, config={"metadata": {"n_messages": len(messages)}}
+    )
+    return {
+        "messages": [response],
+        "turn_count": state.get("turn_count", 0) + 1,
+    }
+
+
+# The echo fallback is cached too, so a failed LLM setup isn't retried
+@functools.lru_cache(maxsize=None)
 def build_llm_chatbot_graph():
     """
     Build a chatbot graph with Ollama's Llama 3.1 and LangSmith tracing.
@@ -108,26 +296,8 @@ def build_llm_chatbot_graph():
     Requires Ollama to be running locally with llama3.1 model installed.
     """
     try:
-        from langchain_ollama import ChatOllama
-
-        # Initialize Ollama LLM with Llama 3.1
-        llm = ChatOllama(
-            model="llama3.1",
-            temperature=0,
-            base_url="http://localhost:11434",  # Default Ollama URL
-        )
-
-        def llm_chatbot_node(state: ChatState) -> dict:
-            """Chatbot node that uses an actual LLM (traced by LangSmith)"""
-            messages = state["messages"]
-            print(f"LLM processing {len(messages)} messages")
-
-            # This LLM call will be automatically traced
-            response = llm.invoke(messages)
-            return {
-                "messages": [response],
-                "turn_count": state.get("turn_count", 0) + 1,
-            }
+        # Fail early (and fall back) if the LLM can't be created
+        _get_ollama_llm()
 
         graph_builder = StateGraph(ChatState)
         graph_builder.add_node("chatbot", llm_chatbot_node)
@@ -141,14 +311,31 @@ def build_llm_chatbot_graph():
         return build_chatbot_graph()
 
 
-def example_basic_tracing():
-    """Example 1: Basic tracing with environment variables"""
-    print("=" * 60)
-    print("Example 1: Basic LangSmith Tracing")
-    print("=" * 60)
+# Run configs for the examples, built once and shared by every call.
+# LangChain copies tags/metadata when it reads a config, so these are never
+# mutated - treat them as read-only.
+# The constant metadata is a read-only mapping so nothing downstream can change
+# it between runs (the LangSmith client serializes it with orjson on export).
+_RUN_METADATA = types.MappingProxyType(
+    {
+        "user_id": "user_123",
+        "session_id": "session_456",
+        "version": "1.0.0",
+    }
+)
+_BASIC_RUN_CONFIG = {"run_name": "basic-chatbot-run"}
+_METADATA_RUN_CONFIG = {
+    "run_name": "custom-chatbot-run",
+    "tags": ["tutorial", "observability", "demo"],
+    "metadata": _RUN_METADATA,
+}
+_LLM_RUN_CONFIG = {"run_name": "llm-chatbot-trace", "tags": ["llm", "ollama", "llama3.1"]}
+_STREAMING_RUN_CONFIG = {"run_name": "streaming-chatbot", "tags": ["streaming"]}
 
-    # Setup LangSmith
-    client = setup_langsmith()
+
+def example_basic_tracing(client):
+    """Example 1: Basic tracing, with and without custom metadata"""
+    print_banner("Example 1: Basic Tracing and Custom Metadata")
 
     if not client:
         print("\n⚠️  Skipping tracing example - API key not configured")
@@ -157,69 +344,38 @@ def example_basic_tracing():
     # Build and run graph
     graph = build_chatbot_graph()
 
-    # Run with tracing enabled
-    # Traces are automatically sent to LangSmith
-    with tracing_v2_enabled(client=client):
-        state = {
+    # Two runs in one batch: a plain run and one with custom metadata/tags.
+    # Each config's run_name tells them apart in LangSmith.
+    states = [
+        {
             "messages": [HumanMessage(content="Hello! What is LangGraph?")],
             "turn_count": 0,
-        }
-        result = graph.invoke(state)
-
-        print(f"\nUser: {state['messages'][0].content}")
-        print(f"Assistant: {result['messages'][-1].content}")
-        print(f"Turns: {result['turn_count']}")
-
-    print("\n✅ Check your LangSmith dashboard to see the trace!")
-
-
-def example_custom_trace_metadata():
-    """Example 2: Adding custom metadata to traces"""
-    print("\n" + "=" * 60)
-    print("Example 2: Custom Trace Metadata")
-    print("=" * 60)
-
-    client = setup_langsmith()
-
-    if not client:
-        print("\n⚠️  Skipping tracing example - API key not configured")
-        return
-
-    graph = build_chatbot_graph()
-
-    # Add custom metadata to the trace
-    config = {
-        "run_name": "custom-chatbot-run",
-        "tags": ["tutorial", "observability", "demo"],
-        "metadata": {
-            "user_id": "user_123",
-            "session_id": "session_456",
-            "version": "1.0.0",
         },
-    }
-
-    with tracing_v2_enabled(client=client):
-        state = {
+        {
             "messages": [HumanMessage(content="Tell me about observability")],
             "turn_count": 0,
-        }
-        result = graph.invoke(state, config)
+        },
+    ]
+    configs = [_BASIC_RUN_CONFIG, _METADATA_RUN_CONFIG]
 
+    # Tracing is enabled once in __main__; each run is sampled on its own
+    # Traces are automatically sent to LangSmith
+    results = batch_with_sampling(graph, states, configs)
+
+    for state, config, result in zip(states, configs, results):
         print(f"\nUser: {state['messages'][0].content}")
         print(f"Assistant: {result['messages'][-1].content}")
+        print(f"Turns: {result['turn_count']}")
         print(f"Run name: {config['run_name']}")
-        print(f"Tags: {config['tags']}")
+        if "tags" in config:
+            print(f"Tags: {config['tags']}")
 
-    print("\n✅ Check LangSmith for trace with custom metadata!")
+    print("\n✅ Check your LangSmith dashboard to see both traces!")
 
 
-def example_llm_tracing():
-    """Example 3: Tracing LLM calls (requires Ollama)"""
-    print("\n" + "=" * 60)
-    print("Example 3: LLM Call Tracing")
-    print("=" * 60)
-
-    client = setup_langsmith()
+def example_llm_tracing(client):
+    """Example 2: Tracing LLM calls (requires Ollama)"""
+    print_banner("Example 2: LLM Call Tracing")
 
     if not client:
         print("\n⚠️  Skipping LLM tracing - API key not configured")
@@ -243,9 +399,9 @@ def example_llm_tracing():
 
     graph = build_llm_chatbot_graph()
 
-    config = {"run_name": "llm-chatbot-trace", "tags": ["llm", "ollama", "llama3.1"]}
+    config = _LLM_RUN_CONFIG
 
-    with tracing_v2_enabled(client=client):
+    with maybe_tracing():
         state = {
             "messages": [HumanMessage(content="What is observability in AI?")],
             "turn_count": 0,
@@ -259,13 +415,9 @@ def example_llm_tracing():
     print("   You'll see token usage, latency, and response details")
 
 
-def example_streaming_with_tracing():
-    """Example 4: Streaming with tracing"""
-    print("\n" + "=" * 60)
-    print("Example 4: Streaming with Tracing")
-    print("=" * 60)
-
-    client = setup_langsmith()
+def example_streaming_with_tracing(client):
+    """Example 3: Streaming with tracing"""
+    print_banner("Example 3: Streaming with Tracing")
 
     if not client:
         print("\n⚠️  Skipping streaming example - API key not configured")
@@ -273,42 +425,75 @@ def example_streaming_with_tracing():
 
     graph = build_chatbot_graph()
 
-    config = {"run_name": "streaming-chatbot", "tags": ["streaming"]}
+    config = _STREAMING_RUN_CONFIG
 
-    with tracing_v2_enabled(client=client):
+    with maybe_tracing():
         state = {"messages": [HumanMessage(content="Count to 3")], "turn_count": 0}
 
         print("\nStreaming execution:")
-        for event in graph.stream(state, config, stream_mode="values"):
-            if "messages" in event:
-                last_msg = event["messages"][-1]
-                if isinstance(last_msg, AIMessage):
-                    print(f"  → {last_msg.content}")
-            if "turn_count" in event:
-                print(f"  → Turn count: {event['turn_count']}")
+        # "updates" yields only what each node returned, not the full state
+        for event in graph.stream(state, config, stream_mode="updates"):
+            for node, update in event.items():
+                if not update:
+                    continue
+                msgs = update.get("messages")
+                if msgs:
+                    last = msgs[-1]
+                    # Exact type check - no MRO walk per event
+                    if last.__class__ is AIMessage:
+                        sys.stdout.write(f"  → [{node}] {last.content}\n")
+                turn_count = update.get("turn_count")
+                if turn_count is not None:
+                    sys.stdout.write(f"  → Turn count: {turn_count}\n")
+        sys.stdout.flush()
 
     print("\n✅ Streamed execution traced in LangSmith!")
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from langchain_core.tracers.context import tracing_v2_enabled
+    from langchain_core.tracers.langchain import wait_for_all_tracers
+
+    # Load environment variables
+    load_dotenv()
+
+    logging.basicConfig(stream=sys.stdout, format="%(message)s")
+    log.setLevel(logging.DEBUG)
+
     print("LangGraph + LangSmith Observability Tutorial")
-    print("=" * 60)
-    print("\nThis tutorial demonstrates LangSmith integration for:")
-    print("  • Automatic tracing of graph execution")
-    print("  • LLM call monitoring")
-    print("  • Performance metrics")
-    print("  • Debugging and error tracking")
-    print("\n" + "=" * 60)
-
-    # Run examples
-    example_basic_tracing()
-    example_custom_trace_metadata()
-    example_llm_tracing()
-    example_streaming_with_tracing()
-
-    print("\n" + "=" * 60)
-    print("Summary")
-    print("=" * 60)
+    sys.stdout.write(
+        "".join(
+            [
+                _SEP,
+                "\nThis tutorial demonstrates LangSmith integration for:\n",
+                "  • Automatic tracing of graph execution\n",
+                "  • LLM call monitoring\n",
+                "  • Performance metrics\n",
+                "  • Debugging and error tracking\n",
+                "\n",
+                _SEP,
+            ]
+        )
+    )
+
+    # Setup LangSmith once and share the client between examples
+    client = setup_langsmith()
+
+    # Run examples inside a single tracing context (only when configured)
+    tracing = (
+        tracing_v2_enabled(client=client) if client else contextlib.nullcontext()
+    )
+    with tracing:
+        example_basic_tracing(client)
+        example_llm_tracing(client)
+        example_streaming_with_tracing(client)
+
+    # Traces are sent in the background - wait for them before exiting
+    if client:
+        wait_for_all_tracers()
+
+    print_banner("Summary")
     print(
         """
 LangSmith Integration Benefits:
@@ -343,5 +528,9 @@ Environment Variables:
 - LANGSMITH_API_KEY: Your API key (required)
 - LANGCHAIN_PROJECT: Project name (optional)
 - LANGCHAIN_ENDPOINT: API endpoint (optional, defaults to smith.langchain.com)
+- LANGSMITH_SAMPLE_RATE: Fraction of runs to trace, 0.0 - 1.0
+  (optional, defaults to 1.0)
+- LANGCHAIN_CALLBACKS_BACKGROUND: Send traces in the background
+  (optional, defaults to true; use false only for short scripts)
     """
     )